@@ -1,5 +1,8 @@
 import os
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 # 数据库配置
 DATABASE_CONFIG = {
@@ -7,16 +10,27 @@ DATABASE_CONFIG = {
     'port': int(os.getenv('DB_PORT', 5432)),
     'database': os.getenv('DB_NAME', 'zhihu_crawler'),
     'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', 'password')
+    'password': os.getenv('DB_PASSWORD', 'password'),
+    # 回答写入可重复执行（ON CONFLICT DO NOTHING），关闭同步提交以省去每次提交的WAL刷盘等待
+    'synchronous_commit': os.getenv('DB_SYNCHRONOUS_COMMIT', 'off')
 }
 
 # 爬虫配置
 CRAWLER_CONFIG = {
     'headless': False,  # 是否无头模式运行
+    'workers': 1,  # 并行采集的浏览器进程数，1为单浏览器顺序采集
     'answers_per_cleanup': 200,  # 每采集多少个回答清空DOM
     'scroll_delay': (0.67, 1.33),  # 滚动延时范围（秒）- 缩短为原来的1/3
     'page_load_delay': (0.67, 1.33),  # 页面加载延时范围（秒）- 缩短为原来的1/3
+    'page_load_rate': 1.0,  # 问题页面打开速率上限（每秒页面数，令牌桶）
+    'page_load_burst': 1,  # 令牌桶容量，允许的突发页面数
+    'cookie_file': 'zhihu_cookies.json',  # 登录Cookie保存路径，再次启动时免手动登录，留空则不保存
+    'chromedriver_cache_file': 'chromedriver_path.json',  # ChromeDriver路径缓存文件，有效期内启动时不再联网解析驱动版本，留空则不缓存
+    'chromedriver_cache_ttl': 24 * 3600,  # ChromeDriver路径缓存有效期（秒）
+    'html_cache_dir': '',  # 保存回答HTML快照的目录，之后可不开浏览器重新解析，留空则不保存
+    'driver_restart_pages': 200,  # 每打开多少个问题页面重启一次浏览器，限制长时间运行的内存增长
     'max_retries': 3,  # 最大重试次数
+    'max_scroll_retries': 3,  # 连续多少轮回滚重试仍无新回答时停止滚动
     'timeout': 10,  # 元素等待超时时间（秒）
 }
 
@@ -66,19 +80,41 @@ ZHIHU_CONFIG = {
     }
 }
 
+# 后台日志写入线程，每个进程只启动一次
+_log_listener = None
+
 def setup_logging():
-    """设置日志配置"""
-    logging.basicConfig(**LOGGING_CONFIG)
+    """设置日志配置
+    
+    记录日志的线程只把记录放入队列，文件和控制台写入由后台QueueListener线程完成
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return
+    
+    formatter = logging.Formatter(LOGGING_CONFIG['format'])
+    file_handler = logging.FileHandler(
+        LOGGING_CONFIG['filename'],
+        mode=LOGGING_CONFIG['filemode'],
+        encoding=LOGGING_CONFIG['encoding']
+    )
+    file_handler.setFormatter(formatter)
     
     # 同时输出到控制台
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
-    formatter = logging.Formatter(LOGGING_CONFIG['format'])
     console_handler.setFormatter(formatter)
     
-    # 获取根日志记录器并添加控制台处理器
+    # 根日志记录器只挂队列处理器
+    log_queue = queue.Queue(-1)
     root_logger = logging.getLogger()
-    root_logger.addHandler(console_handler)
+    root_logger.setLevel(LOGGING_CONFIG['level'])
+    root_logger.addHandler(QueueHandler(log_queue))
+    
+    _log_listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _log_listener.start()
+    # 退出时写完队列中剩余的日志
+    atexit.register(_log_listener.stop)
 
 def get_database_config():
     """获取数据库配置"""
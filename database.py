@@ -1,58 +1,154 @@
 import psycopg2
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 import logging
-from typing import List, Tuple, Optional
+import re
+from functools import lru_cache
+from typing import List, Tuple, Optional, Set, Iterator, Dict
+
+# 回答时间文本的中文前缀，如"编辑于"、"发布于"
+_TIME_PREFIX_RE = re.compile(r'^(?:编辑于|发布于|发表于|回答于|创建于|更新于)\s*')
+# 回答时间标准格式 YYYY-MM-DD HH:MM
+_TIME_TEXT_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})\s+(\d{1,2}):(\d{1,2})')
+_QUESTION_ID_RE = re.compile(r'/question/(\d+)')
 
 class DatabaseManager:
     """PostgreSQL数据库管理类"""
     
     def __init__(self, host: str = 'localhost', port: int = 5432, 
                  database: str = 'zhihu_crawl', user: str = 'postgres', 
-                 password: str = 'password'):
+                 password: str = 'password', synchronous_commit: str = 'on',
+                 pool: Optional[ThreadedConnectionPool] = None):
         self.host = host
         self.port = port
         self.database = database
         self.user = user
         self.password = password
+        self.synchronous_commit = synchronous_commit
+        # 连接池由首个建立连接的管理器创建，clone出的管理器共用同一个池
+        self.pool = pool
+        self._owns_pool = pool is None
         self.connection = None
         self.cursor = None
+        self._prepared = set()  # 当前连接上已创建的预备语句名
+        self.crawled_totals = {}  # 更新爬取状态时顺带返回的各问题已入库回答数
         
     def connect(self) -> bool:
         """连接数据库"""
         try:
-            self.connection = psycopg2.connect(
-                host=self.host,
-                port=self.port,
-                database=self.database,
-                user=self.user,
-                password=self.password
-            )
+            if self.pool is None:
+                self.pool = ThreadedConnectionPool(
+                    1, 4,
+                    host=self.host,
+                    port=self.port,
+                    database=self.database,
+                    user=self.user,
+                    password=self.password,
+                    # 会话级提交策略，off时提交不等待WAL刷盘，断电最多丢失最近几次提交
+                    options=f"-c synchronous_commit={self.synchronous_commit}",
+                    # 长时间滚动采集期间连接可能空闲较久，开启TCP保活避免被中间设备断开
+                    keepalives=1,
+                    keepalives_idle=30,
+                    keepalives_interval=10,
+                    keepalives_count=3
+                )
+            self.connection = self.pool.getconn()
             self.cursor = self.connection.cursor()
+            # 连接来自连接池，可能已有此前创建的预备语句
+            self.cursor.execute("SELECT name FROM pg_prepared_statements")
+            self._prepared = {row[0] for row in self.cursor.fetchall()}
+            self.connection.commit()
             logging.info(f"成功连接到数据库 {self.database}")
             return True
         except Exception as e:
             logging.error(f"数据库连接失败: {e}")
             return False
     
+    def _execute_prepared(self, name: str, query: str, params: tuple):
+        """以预备语句执行每个问题都会重复的查询，同一连接上只解析和规划一次
+        
+        query使用$1、$2形式的参数占位符
+        """
+        if name not in self._prepared:
+            self.cursor.execute(f"PREPARE {name} AS {query}")
+            self._prepared.add(name)
+        placeholders = ', '.join(['%s'] * len(params))
+        self.cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+    
+    def clone(self) -> 'DatabaseManager':
+        """创建共用连接池、使用独立连接的数据库管理器，供后台线程使用"""
+        return DatabaseManager(
+            host=self.host,
+            port=self.port,
+            database=self.database,
+            user=self.user,
+            password=self.password,
+            synchronous_commit=self.synchronous_commit,
+            pool=self.pool
+        )
+    
     def disconnect(self):
         """断开数据库连接"""
         if self.cursor:
             self.cursor.close()
+            self.cursor = None
         if self.connection:
-            self.connection.close()
+            # 连接归还到池中，由池的创建者统一关闭
+            self.pool.putconn(self.connection)
+            self.connection = None
+        if self._owns_pool and self.pool:
+            self.pool.closeall()
+            self.pool = None
         logging.info("数据库连接已断开")
     
-    def get_questions(self) -> List[Tuple[str, int]]:
-        """从questions表获取URL和answer_count"""
+    def ensure_indexes(self):
+        """确保查询依赖的索引存在
+        
+        回答去重依赖answer_id的唯一约束（ON CONFLICT DO NOTHING），
+        按问题统计和载入已入库回答依赖question_id索引
+        """
         try:
-            query = "SELECT url, answer_count FROM questions WHERE url IS NOT NULL AND answer_count > 0"
-            self.cursor.execute(query)
-            results = self.cursor.fetchall()
-            logging.info(f"获取到 {len(results)} 个问题")
-            return results
+            self.cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_answers_question_id ON answers(question_id)"
+            )
+            self.connection.commit()
         except Exception as e:
-            logging.error(f"获取问题列表失败: {e}")
+            logging.warning(f"创建索引失败: {e}")
+            self.connection.rollback()
+    
+    def iter_questions_with_progress(self, pending_only: bool = False,
+                                     itersize: int = 500) -> Iterator[Tuple[str, int, int]]:
+        """流式获取问题的URL、answer_count和已爬取的回答数量
+        
+        使用服务端命名游标分批取回，不在客户端一次性物化全部结果；
+        pending_only为True时在数据库端过滤掉已采集完成的问题
+        """
+        query = r"""
+        SELECT q.url, q.answer_count, COUNT(a.answer_id)
+        FROM (
+            SELECT url, MAX(answer_count) AS answer_count, MIN(id) AS first_id
+            FROM questions
+            WHERE url IS NOT NULL AND answer_count > 0
+            GROUP BY url
+        ) q
+        LEFT JOIN answers a ON a.question_id = substring(q.url from '/question/(\d+)')
+        GROUP BY q.url, q.answer_count, q.first_id
+        """
+        if pending_only:
+            query += " HAVING COUNT(a.answer_id) < q.answer_count"
+        query += " ORDER BY q.first_id"
+        
+        cursor = self.connection.cursor(name='questions_progress')
+        cursor.itersize = itersize
+        try:
+            cursor.execute(query)
+            yield from cursor
+        except Exception as e:
+            logging.error(f"获取问题进度失败: {e}")
             self.connection.rollback()  # 回滚事务
-            return []
+        finally:
+            if not cursor.closed:
+                cursor.close()
     
     def get_pending_questions(self, limit=None):
         """获取待爬取的问题（包括已完成采集的问题）"""
@@ -84,76 +180,38 @@ class DatabaseManager:
     
     def save_answer(self, question_url: str, answer_data: dict) -> bool:
         """保存回答数据到answers表"""
-        try:
-            # 从URL中提取question_id
-            import re
-            question_id_match = re.search(r'/question/(\d+)', question_url)
-            if not question_id_match:
-                logging.error(f"无法从URL中提取question_id: {question_url}")
-                return False
-            
-            question_id = question_id_match.group(1)
-            
-            # 处理时间格式转换
-            created_time = self._parse_time_string(answer_data.get('created_time'))
-            
-            # 插入回答数据到现有的answers表结构
-            insert_query = """
-            INSERT INTO answers (question_id, answer_id, author, content, vote_count, create_time, task_id, url)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (answer_id) DO NOTHING
-            """
-            
-            # 生成一个简单的task_id（可以使用UUID或其他方式）
-            import uuid
-            task_id = str(uuid.uuid4())
-            
-            self.cursor.execute(insert_query, (
-                question_id,
-                answer_data.get('answer_id'),
-                answer_data.get('author'),
-                answer_data.get('content'),
-                answer_data.get('vote_count', 0),
-                created_time,
-                task_id,
-                question_url
-            ))
-            
-            self.connection.commit()
-            return True
-            
-        except Exception as e:
-            logging.error(f"保存回答数据失败: {e}")
-            self.connection.rollback()
-            return False
+        return self.save_answers_batch(question_url, [answer_data]) > 0
     
-    def save_answers_batch(self, question_url: str, answers_data: List[dict]) -> int:
-        """批量保存回答数据到answers表"""
-        if not answers_data:
+    def save_answers_batch(self, question_url: str, answers_data: List[dict],
+                           crawl_status: Optional[str] = None, crawled_count: int = 0) -> int:
+        """批量保存回答数据到answers表
+        
+        传入crawl_status时，爬取状态的更新与回答写入在同一事务中提交，
+        并通过RETURNING取回该问题已入库的回答总数，记入crawled_totals
+        """
+        if not answers_data and crawl_status is None:
             return 0
             
         try:
             # 从URL中提取question_id
-            import re
-            question_id_match = re.search(r'/question/(\d+)', question_url)
-            if not question_id_match:
+            question_id = extract_question_id(question_url)
+            if question_id is None:
                 logging.error(f"无法从URL中提取question_id: {question_url}")
                 return 0
             
-            question_id = question_id_match.group(1)
-            
-            # 批量插入回答数据
+            # 批量插入回答数据，整批拼成一条多行VALUES语句
             insert_query = """
             INSERT INTO answers (question_id, answer_id, author, content, vote_count, create_time, task_id, url)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            VALUES %s
             ON CONFLICT (answer_id) DO NOTHING
+            RETURNING answer_id
             """
             
             import uuid
+            task_id = str(uuid.uuid4())  # 同一批写入的回答共用一个任务ID
             batch_data = []
             for answer_data in answers_data:
                 created_time = self._parse_time_string(answer_data.get('created_time'))
-                task_id = str(uuid.uuid4())
                 
                 batch_data.append((
                     question_id,
@@ -166,12 +224,36 @@ class DatabaseManager:
                     question_url
                 ))
             
-            # 执行批量插入
-            self.cursor.executemany(insert_query, batch_data)
+            # 执行批量插入，RETURNING只返回实际插入的行，重复的回答不计入保存数量
+            inserted_rows = []
+            if batch_data:
+                # page_size不小于批量大小，每批回答只发送一条INSERT语句
+                inserted_rows = execute_values(
+                    self.cursor, insert_query, batch_data,
+                    page_size=max(len(batch_data), 100), fetch=True
+                )
+            
+            # 与回答写入合并为一次提交
+            total_row = None
+            if crawl_status is not None:
+                # 上面的INSERT对本语句可见，总数与状态更新一次往返拿到
+                self._execute_prepared(
+                    'update_crawl_status_returning_total',
+                    """
+                    UPDATE questions SET crawl_status = $1, crawled_count = $2 WHERE url = $3
+                    RETURNING (SELECT COUNT(*) FROM answers WHERE question_id = $4)
+                    """,
+                    (crawl_status, crawled_count, question_url, question_id)
+                )
+                total_row = self.cursor.fetchone()
             self.connection.commit()
+            if total_row:
+                self.crawled_totals[question_url] = total_row[0]
             
-            saved_count = len(batch_data)
-            logging.info(f"批量保存 {saved_count} 个回答成功")
+            saved_count = len(inserted_rows)
+            logging.info("批量保存 %d 个回答成功", saved_count)
+            if crawl_status is not None:
+                logging.info("更新URL %s 状态为 %s，已爬取 %d 个回答", question_url, crawl_status, crawled_count)
             return saved_count
             
         except Exception as e:
@@ -183,58 +265,100 @@ class DatabaseManager:
         """解析中文时间字符串为数据库可接受的格式"""
         if not time_str:
             return None
-            
-        import re
-        from datetime import datetime
         
+        # 同一问题下大量回答共享相同的时间文本，按原始文本缓存解析结果
+        formatted_time = _parse_time_text(time_str)
+        if formatted_time is None:
+            # 告警放在缓存之外，每条无法解析的回答都会记录
+            logging.warning("无法解析时间格式: %s", time_str)
+        return formatted_time
+    
+    def get_crawled_answer_ids(self, question_url: str) -> Set[str]:
+        """获取问题已入库的回答ID集合，用于跳过重复写入"""
         try:
-            # 移除中文前缀
-            time_str = time_str.strip()
-            
-            # 处理"编辑于"、"发布于"等前缀
-            if '编辑于' in time_str:
-                time_str = time_str.replace('编辑于', '').strip()
-            elif '发布于' in time_str:
-                time_str = time_str.replace('发布于', '').strip()
-            
-            # 移除地点信息（如"・美国"）
-            if '・' in time_str:
-                time_str = time_str.split('・')[0].strip()
-            
-            # 尝试解析标准格式 YYYY-MM-DD HH:MM
-            date_pattern = r'(\d{4})-(\d{1,2})-(\d{1,2})\s+(\d{1,2}):(\d{1,2})'
-            match = re.search(date_pattern, time_str)
+            # 从URL中提取question_id
+            question_id = extract_question_id(question_url)
+            if question_id is None:
+                logging.error(f"无法从URL中提取question_id: {question_url}")
+                return set()
             
-            if match:
-                year, month, day, hour, minute = match.groups()
-                # 格式化为标准时间戳格式
-                formatted_time = f"{year}-{month.zfill(2)}-{day.zfill(2)} {hour.zfill(2)}:{minute.zfill(2)}:00"
-                return formatted_time
-            else:
-                # 如果无法解析，返回None
-                logging.warning(f"无法解析时间格式: {time_str}")
-                return None
-                
+            self._execute_prepared(
+                'crawled_answer_ids',
+                "SELECT answer_id FROM answers WHERE question_id = $1",
+                (question_id,)
+            )
+            return {row[0] for row in self.cursor.fetchall()}
         except Exception as e:
-            logging.error(f"时间解析失败: {e}, 原始字符串: {time_str}")
-            return None
+            logging.error(f"获取已入库回答ID失败: {e}")
+            self.connection.rollback()  # 回滚事务
+            return set()
     
     def get_crawled_count(self, question_url: str) -> int:
         """获取已爬取的回答数量"""
         try:
             # 从URL中提取question_id
-            import re
-            question_id_match = re.search(r'/question/(\d+)', question_url)
-            if not question_id_match:
+            question_id = extract_question_id(question_url)
+            if question_id is None:
                 logging.error(f"无法从URL中提取question_id: {question_url}")
                 return 0
             
-            question_id = question_id_match.group(1)
-            query = "SELECT COUNT(*) FROM answers WHERE question_id = %s"
-            self.cursor.execute(query, (question_id,))
+            self._execute_prepared(
+                'crawled_count',
+                "SELECT COUNT(*) FROM answers WHERE question_id = $1",
+                (question_id,)
+            )
             result = self.cursor.fetchone()
             return result[0] if result else 0
         except Exception as e:
             logging.error(f"获取已爬取数量失败: {e}")
             self.connection.rollback()  # 回滚事务
-            return 0
\ No newline at end of file
+            return 0
+    
+    def get_crawled_counts(self, question_urls: List[str]) -> Dict[str, int]:
+        """一次查询获取多个问题已爬取的回答数量"""
+        question_ids = {}
+        for url in question_urls:
+            question_id = extract_question_id(url)
+            if question_id is not None:
+                question_ids[url] = question_id
+        
+        try:
+            query = """
+            SELECT question_id, COUNT(*) FROM answers
+            WHERE question_id = ANY(%s)
+            GROUP BY question_id
+            """
+            self.cursor.execute(query, (list(set(question_ids.values())),))
+            counts = dict(self.cursor.fetchall())
+            return {url: counts.get(question_ids.get(url), 0) for url in question_urls}
+        except Exception as e:
+            logging.error(f"获取已爬取数量失败: {e}")
+            self.connection.rollback()  # 回滚事务
+            return {url: 0 for url in question_urls}
+
+@lru_cache(maxsize=4096)
+def extract_question_id(url: str) -> Optional[str]:
+    """从问题链接中提取question_id，无法提取时返回None"""
+    match = _QUESTION_ID_RE.search(url)
+    return match.group(1) if match else None
+
+@lru_cache(maxsize=2048)
+def _parse_time_text(time_str: str) -> Optional[str]:
+    """解析中文时间文本，无法解析时返回None"""
+    try:
+        # 移除"编辑于"、"发布于"等中文前缀，一次锚定匹配完成
+        time_str = _TIME_PREFIX_RE.sub('', time_str.strip(), count=1)
+        
+        # 移除地点信息（如"・美国"）
+        if '・' in time_str:
+            time_str = time_str.split('・')[0].strip()
+        
+        match = _TIME_TEXT_RE.search(time_str)
+        if match:
+            year, month, day, hour, minute = match.groups()
+            return f"{year}-{month.zfill(2)}-{day.zfill(2)} {hour.zfill(2)}:{minute.zfill(2)}:00"
+        return None
+            
+    except Exception as e:
+        logging.error(f"时间解析失败: {e}, 原始字符串: {time_str}")
+        return None
@@ -5,16 +5,78 @@ import sys
 import time
 import logging
 import signal
-from typing import List, Tuple
+import multiprocessing
+from typing import List, Tuple, Dict, Optional
 
 from database import DatabaseManager
-from zhihu_crawler import ZhihuCrawler
+from zhihu_crawler import ZhihuCrawler, RateLimiter
 from config import (
     setup_logging, 
     get_database_config, 
     get_crawler_config
 )
 
+# 并行采集时每个工作进程独立持有的爬虫实例
+_worker_crawler = None
+# 工作进程初始化失败的原因；初始化函数抛出异常会让进程池不断重建工作进程，因此只记录下来交给任务返回
+_worker_init_error = None
+
+def _init_worker(cookies: List[Dict], headless: bool, page_limiter_state):
+    """工作进程初始化：建立独立的数据库连接和浏览器，并注入主进程的登录Cookie"""
+    global _worker_crawler, _worker_init_error
+    
+    setup_logging()
+    # 中断由主进程统一处理，工作进程收到终止信号时关闭自己的浏览器
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _worker_signal_handler)
+    
+    db_manager = DatabaseManager(**get_database_config())
+    try:
+        if not db_manager.connect():
+            raise RuntimeError("工作进程数据库连接失败")
+        
+        _worker_crawler = ZhihuCrawler(
+            db_manager=db_manager, headless=headless, page_limiter_state=page_limiter_state
+        )
+        _worker_crawler.setup_driver()
+        _worker_crawler.load_cookies(cookies)
+    except Exception as e:
+        logging.error(f"工作进程初始化失败: {e}")
+        _worker_init_error = f"工作进程初始化失败: {e}"
+        try:
+            if _worker_crawler:
+                _worker_crawler.close()
+            db_manager.disconnect()
+        except Exception as cleanup_error:
+            logging.debug("释放工作进程资源失败: %s", cleanup_error)
+        _worker_crawler = None
+
+def _worker_signal_handler(signum, frame):
+    """工作进程退出时释放浏览器和数据库连接"""
+    if _worker_crawler:
+        _worker_crawler.close()
+        _worker_crawler.db_manager.disconnect()
+    sys.exit(0)
+
+def _crawl_question_worker(task: Tuple[str, int]) -> Tuple[str, int, int, int, float, Optional[str]]:
+    """在工作进程中采集单个问题，返回(url, 目标数, 本次新增, 总计采集, 耗时, 错误)
+    
+    工作进程无法继续采集时不采集，错误中返回原因，由主进程停止进程池
+    """
+    url, target_count = task
+    if _worker_init_error:
+        return url, target_count, 0, 0, 0.0, _worker_init_error
+    # 浏览器会话失效时先重启浏览器，重启失败则交给主进程停止本轮，避免剩余问题都直接返回0
+    if not _worker_crawler.recover_session():
+        return url, target_count, 0, 0, 0.0, "工作进程浏览器会话已失效且重启失败"
+    
+    question_start_time = time.time()
+    new_crawled = _worker_crawler.crawl_question_with_retry(url, target_count)
+    total_crawled = _worker_crawler.last_crawled_total
+    if total_crawled is None:
+        total_crawled = _worker_crawler.db_manager.get_crawled_count(url)
+    return url, target_count, new_crawled, total_crawled, time.time() - question_start_time, None
+
 class ZhihuCrawlerApp:
     """知乎爬虫应用主类"""
     
@@ -22,6 +84,8 @@ class ZhihuCrawlerApp:
         self.db_manager = None
         self.crawler = None
         self.running = True
+        self.crawler_config = get_crawler_config()  # 启动时读取一次，运行期间不再重复查找
+        self.crawled_counts = {}  # 本轮开始时各问题已爬取数量，避免逐个问题重复查询
         
         # 设置信号处理
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -48,12 +112,12 @@ class ZhihuCrawlerApp:
             if not self.db_manager.connect():
                 logging.error("数据库连接失败")
                 return False
+            self.db_manager.ensure_indexes()
             
             # 初始化爬虫
-            crawler_config = get_crawler_config()
             self.crawler = ZhihuCrawler(
                 db_manager=self.db_manager,
-                headless=crawler_config['headless']
+                headless=self.crawler_config['headless']
             )
             
             self.crawler.setup_driver()
@@ -112,17 +176,13 @@ class ZhihuCrawlerApp:
     def get_questions_to_crawl(self) -> List[Tuple[str, int]]:
         """获取待爬取的问题列表"""
         try:
-            questions = self.db_manager.get_questions()
-            
-            # 过滤已完成的问题
+            # 问题列表与已爬取数量一次查询取回，已完成的问题在数据库端过滤，结果分批流式读取
             filtered_questions = []
-            for url, answer_count in questions:
-                crawled_count = self.db_manager.get_crawled_count(url)
-                if crawled_count < answer_count:
-                    filtered_questions.append((url, answer_count))
-                    logging.info(f"问题 {url}: 目标 {answer_count} 个回答，已爬取 {crawled_count} 个")
-                else:
-                    logging.info(f"问题 {url} 已完成爬取")
+            self.crawled_counts = {}
+            for url, answer_count, crawled_count in self.db_manager.iter_questions_with_progress(pending_only=True):
+                self.crawled_counts[url] = crawled_count
+                filtered_questions.append((url, answer_count))
+                logging.info("问题 %s: 目标 %d 个回答，已爬取 %d 个", url, answer_count, crawled_count)
             
             return filtered_questions
             
@@ -130,6 +190,13 @@ class ZhihuCrawlerApp:
             logging.error(f"获取问题列表失败: {e}")
             return []
     
+    def get_cached_crawled_count(self, url: str) -> int:
+        """获取本轮开始时查询到的已爬取数量，未缓存时查询数据库"""
+        crawled_count = self.crawled_counts.get(url)
+        if crawled_count is None:
+            crawled_count = self.db_manager.get_crawled_count(url)
+        return crawled_count
+    
     def crawl_questions(self, questions: List[Tuple[str, int]]) -> bool:
         """批量爬取问题"""
         total_questions = len(questions)
@@ -139,9 +206,22 @@ class ZhihuCrawlerApp:
         
         print(f"\n=== 开始采集 {total_questions} 个问题 ===")
         
-        for i, (url, target_count) in enumerate(questions, 1):
+        workers = self.crawler_config['workers']
+        if workers > 1 and total_questions > 1:
+            success_count, total_answers = self.crawl_questions_parallel(questions, workers)
+            # 并行模式下已由工作进程完成采集，不再进入顺序循环
+            questions_iter = []
+        else:
+            questions_iter = questions
+        
+        for i, (url, target_count) in enumerate(questions_iter, 1):
             if not self.running:
                 break
+            
+            # 浏览器会话已失效时先重启浏览器，重启失败则后续问题都会失败，直接结束本轮
+            if not self.crawler.recover_session():
+                print("❌ 浏览器会话已失效且重启失败，停止本轮采集")
+                break
                 
             current_time = time.time()
             elapsed_time = current_time - start_time
@@ -150,8 +230,8 @@ class ZhihuCrawlerApp:
             print(f"目标回答数: {target_count}, 已用时: {elapsed_time:.1f}秒")
             
             try:
-                # 检查已爬取数量
-                crawled_count = self.db_manager.get_crawled_count(url)
+                # 检查已爬取数量（本轮开始时已查询过）
+                crawled_count = self.get_cached_crawled_count(url)
                 remaining_count = target_count - crawled_count
                 
                 if remaining_count <= 0:
@@ -164,11 +244,13 @@ class ZhihuCrawlerApp:
                 
                 # 开始爬取
                 question_start_time = time.time()
-                new_crawled = self.crawler.crawl_question_answers(url, target_count)
+                new_crawled = self.crawler.crawl_question_with_retry(url, target_count)
                 question_end_time = time.time()
                 
-                # 统计结果
-                total_crawled = self.db_manager.get_crawled_count(url)
+                # 统计结果，总数已在保存爬取状态时一并返回，取不到时再查询
+                total_crawled = self.crawler.last_crawled_total
+                if total_crawled is None:
+                    total_crawled = self.db_manager.get_crawled_count(url)
                 completion_rate = (total_crawled / target_count) * 100
                 
                 if total_crawled >= target_count:
@@ -211,6 +293,68 @@ class ZhihuCrawlerApp:
         # 返回是否全部成功
         return success_count == total_questions
     
+    def crawl_questions_parallel(self, questions: List[Tuple[str, int]], workers: int) -> Tuple[int, int]:
+        """使用多个浏览器进程并行爬取问题，返回(成功数, 总回答数)"""
+        total_questions = len(questions)
+        success_count = 0
+        total_answers = 0
+        
+        # 已完成的问题直接跳过，不占用工作进程
+        tasks = []
+        for url, target_count in questions:
+            crawled_count = self.get_cached_crawled_count(url)
+            if crawled_count >= target_count:
+                success_count += 1
+                total_answers += crawled_count
+            else:
+                tasks.append((url, target_count))
+        
+        if not tasks:
+            return success_count, total_answers
+        
+        workers = min(workers, len(tasks))
+        print(f"使用 {workers} 个浏览器进程并行采集 {len(tasks)} 个问题")
+        
+        # Selenium驱动和数据库连接不能跨进程共享，使用spawn让每个工作进程独立创建
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(
+            processes=workers,
+            initializer=_init_worker,
+            initargs=(
+                self.crawler.get_cookies(),
+                self.crawler_config['headless'],
+                # 所有工作进程共用一个页面打开令牌桶
+                RateLimiter.create_shared_state(context, self.crawler_config['page_load_burst'])
+            )
+        ) as pool:
+            done = total_questions - len(tasks)
+            for url, target_count, new_crawled, total_crawled, elapsed, error in pool.imap_unordered(_crawl_question_worker, tasks):
+                if not self.running:
+                    pool.terminate()
+                    break
+                
+                if error:
+                    logging.error(f"并行采集中止: {error}")
+                    print(f"❌ {error}，停止本轮并行采集")
+                    pool.terminate()
+                    break
+                
+                done += 1
+                completion_rate = (total_crawled / target_count) * 100
+                status = "✅ 采集完成！" if total_crawled >= target_count else "⚠️  部分完成"
+                if total_crawled >= target_count:
+                    success_count += 1
+                total_answers += total_crawled
+                
+                print(f"\n[{done}/{total_questions}] {url} {status}")
+                print(f"本次新增: {new_crawled} 个回答, 总计采集: {total_crawled} 个回答, "
+                      f"完成度: {completion_rate:.1f}%, 耗时: {elapsed:.1f} 秒")
+                print(f"总进度: {done / total_questions * 100:.1f}% ({done}/{total_questions}), "
+                      f"成功: {success_count}, 总回答数: {total_answers}")
+        # 退出with时Pool会terminate工作进程，触发其浏览器清理
+        
+        return success_count, total_answers
+    
     def print_summary(self, questions: List[Tuple[str, int]]):
         """打印爬取总结"""
         print("\n=== 爬取总结 ===")
@@ -219,8 +363,10 @@ class ZhihuCrawlerApp:
         total_crawled = 0
         completed_questions = 0
         
+        # 所有问题的已爬取数量一次查询取回
+        crawled_counts = self.db_manager.get_crawled_counts([url for url, _ in questions])
         for url, target_count in questions:
-            crawled_count = self.db_manager.get_crawled_count(url)
+            crawled_count = crawled_counts[url]
             total_target += target_count
             total_crawled += crawled_count
             
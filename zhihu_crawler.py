@@ -1,34 +1,442 @@
 import time
 import random
+import hashlib
+import gzip
 import logging
 import json
+import os
 import re
-from typing import List, Dict, Optional
+import queue
+import threading
+from functools import lru_cache
+from urllib.parse import urlparse
+from typing import List, Dict, Optional, Set, Iterator
 from selenium import webdriver
-from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import (
+    TimeoutException, WebDriverException,
+    InvalidSessionIdException, NoSuchWindowException
+)
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-from database import DatabaseManager
-from config import get_crawler_config
+from lxml import etree, html as lxml_html
+from database import DatabaseManager, extract_question_id
+from config import get_crawler_config, get_zhihu_config
+
+# 点赞按钮aria-label中的数字，如"赞同 123"
+_VOTE_LABEL_RE = re.compile(r'赞同\s+(\d+)')
+_ANSWER_ID_RE = re.compile(r'/answer/(\d+)')
+# 点赞数文本，如"1.2 万"、"3,456"，数字与可选的量级后缀一次匹配
+_VOTE_COUNT_RE = re.compile(r'(\d+(?:[.,]\d+)*)\s*([万千亿])?')
+_VOTE_MULTIPLIERS = {'亿': 100000000, '万': 10000, '千': 1000, None: 1}
+
+def _css_class(name: str) -> str:
+    """CSS类选择器对应的XPath条件"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+# 回答字段的XPath，与原CSS选择器一一对应，在本地解析的HTML上执行，不再逐个发起WebDriver请求
+_ANSWER_LINK_XPATH = etree.XPath('.//a[contains(@href, "/answer/")]/@href')
+_AUTHOR_XPATHS = [
+    etree.XPath(f'.//*[{_css_class("AuthorInfo-name")}]'),
+    etree.XPath(f'.//*[{_css_class("UserLink-link")}]'),
+    etree.XPath(f'.//*[{_css_class("AuthorInfo")}]//*[{_css_class("Popover")}]//div'),
+]
+_CONTENT_XPATH = etree.XPath(f'.//*[{_css_class("RichContent-inner")}]')
+_CONTENT_BACKUP_XPATHS = [
+    etree.XPath(f'.//*[{_css_class("CopyrightRichText-richText")}]'),
+    etree.XPath(f'.//*[{_css_class("RichText")}]'),
+    etree.XPath(f'.//*[{_css_class("AnswerItem-content")}]'),
+]
+_ACTIONS_XPATH = etree.XPath(f'.//*[{_css_class("ContentItem-actions")}]')
+_VOTE_BUTTON_XPATH = etree.XPath(f'.//button[{_css_class("VoteButton")}][contains(@aria-label, "赞同")]')
+_VOTE_BACKUP_XPATHS = [
+    etree.XPath(f'.//*[{_css_class("VoteButton--up")}]//*[{_css_class("Button-label")}]'),
+    etree.XPath(f'.//*[{_css_class("VoteButton")}]//*[{_css_class("Voters")}]'),
+    etree.XPath(f'.//*[{_css_class("Button--plain")}]'),
+]
+_TIME_XPATHS = [
+    etree.XPath(f'.//*[{_css_class("ContentItem-time")}]'),
+    etree.XPath(f'.//*[{_css_class("AnswerItem-time")}]'),
+    etree.XPath('.//time'),
+]
+
+# 通过CDP直接拦截的资源扩展名，采集只需要文本，图片、视频和字体请求不必发出
+_BLOCKED_EXTENSIONS = (
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'svg',
+    'mp4', 'm3u8', 'ts',
+    'woff', 'woff2', 'ttf',
+)
+
+# Network.setBlockedURLs的模式匹配完整URL，知乎图片链接带查询参数（如 ..._720w.jpg?source=xxx），
+# 每个扩展名同时拦截不带和带查询参数两种形式
+_BLOCKED_URL_PATTERNS = [
+    pattern for ext in _BLOCKED_EXTENSIONS for pattern in (f'*.{ext}', f'*.{ext}?*')
+] + [
+    # 知乎图片和视频CDN，部分图片链接不带扩展名
+    '*://pic*.zhimg.com/*',
+    '*://*.vzuu.com/*',
+    # 统计上报请求会持续占用网络，拖慢滚动后页面高度稳定
+    '*sugar.zhihu.com*',
+    '*zhihu.com/api/v4/tracker*',
+    '*appcloud2.zhihu.com*',
+    '*hm.baidu.com*',
+    '*google-analytics.com*',
+]
+
+# "查看全部回答"按钮的多种可能选择器，按优先级排列
+_VIEW_ALL_SELECTORS = (
+    '.Card.ViewAll a[data-za-detail-view-element_name="ViewAll"]',
+    '.ViewAll-QuestionMainAction',
+    '.Card.ViewAll a',
+    'a[data-za-detail-view-element_name="ViewAll"]',
+    'button[data-za-detail-view-element_name="QuestionAnswers-more"]',
+    '.QuestionAnswers-more button'
+)
+
+# 选择器都未命中时，按button文本匹配"查看全部回答"按钮的关键字
+_VIEW_ALL_KEYWORDS = ('查看全部', '个回答')
+
+# 登录状态探测：出现用户头像或用户菜单返回'in'，出现登录按钮返回'out'，页面尚未渲染完成返回null
+_LOGIN_STATE_JS = """
+if (document.querySelector('.Avatar, .Menu-item, [data-za-detail-view-element_name="Profile"]')) {
+    return 'in';
+}
+var buttons = document.getElementsByTagName('button');
+for (var i = 0; i < buttons.length; i++) {
+    if ((buttons[i].textContent || '').indexOf('登录') !== -1) {
+        return 'out';
+    }
+}
+return null;
+"""
+
+class _LoginStateKnown:
+    """等待条件：页面已能判断登录状态，返回'in'或'out'"""
+    
+    def __call__(self, driver) -> Optional[str]:
+        return driver.execute_script(_LOGIN_STATE_JS)
+
+# "加载更多"按钮的候选选择器，按优先级排列
+_LOAD_MORE_SELECTORS = [
+    '.QuestionAnswers-more button',  # 问题回答区域的加载更多按钮
+    'button[class*="QuestionAnswers"][class*="more"]',  # 包含QuestionAnswers和more的按钮
+    '.List-more button',  # 列表区域的加载更多按钮
+    '.QuestionAnswers-actions button',  # 问题回答操作区域的按钮
+    'button[class*="LoadMore"]'  # 包含LoadMore的按钮
+]
+
+# 一次取回页面上所有回答元素的HTML
+_ANSWER_ITEMS_HTML_JS = """
+return Array.prototype.map.call(
+    document.querySelectorAll('.List-item'), function(item) { return item.outerHTML; }
+).join('');
+"""
+
+# 记录回答数量、跳转到页面底部、按优先级查找并点击"加载更多"按钮，返回[滚动前回答数, 点击的选择器]
+_SCROLL_AND_LOAD_MORE_JS = """
+var count = document.querySelectorAll('.List-item').length;
+window.scrollTo(0, document.body.scrollHeight);
+var selectors = arguments[0];
+for (var s = 0; s < selectors.length; s++) {
+    var buttons = document.querySelectorAll(selectors[s]);
+    for (var i = 0; i < buttons.length; i++) {
+        var btn = buttons[i];
+        // 跳过不可见、不可用的按钮以及搜索按钮
+        if (btn.disabled || btn.offsetParent === null) {
+            continue;
+        }
+        if ((btn.className || '').indexOf('SearchBar') !== -1 ||
+            (btn.getAttribute('aria-label') || '').indexOf('Search') !== -1) {
+            continue;
+        }
+        btn.click();
+        return [count, selectors[s]];
+    }
+}
+return [count, null];
+"""
+
+# 按选择器优先级查找可见可用的"查看全部回答"按钮，都未命中时再按文本只查找button标签（避免点击a标签链接），
+# 找到即滚动到按钮并点击，返回命中的选择器或按钮文本，未找到返回null
+_CLICK_VIEW_ALL_JS = """
+var selectors = arguments[0], keywords = arguments[1];
+function clickable(el) {
+    return !el.disabled && el.offsetParent !== null;
+}
+function click(el) {
+    el.scrollIntoView(true);
+    el.click();
+}
+for (var s = 0; s < selectors.length; s++) {
+    var candidates = document.querySelectorAll(selectors[s]);
+    for (var i = 0; i < candidates.length; i++) {
+        if (clickable(candidates[i])) {
+            click(candidates[i]);
+            return selectors[s];
+        }
+    }
+}
+var buttons = document.getElementsByTagName('button');
+for (var i = 0; i < buttons.length; i++) {
+    var text = (buttons[i].innerText || '').trim();
+    for (var k = 0; k < keywords.length; k++) {
+        if (text.indexOf(keywords[k]) !== -1 && clickable(buttons[i])) {
+            click(buttons[i]);
+            return text;
+        }
+    }
+}
+return null;
+"""
+
+class _ViewAllClicked:
+    """等待条件：找到并点击了"查看全部回答"按钮，返回命中的选择器或按钮文本"""
+    
+    def __call__(self, driver) -> Optional[str]:
+        return driver.execute_script(_CLICK_VIEW_ALL_JS, _VIEW_ALL_SELECTORS, _VIEW_ALL_KEYWORDS)
+
+# 页面内统计回答元素数量，不必把所有回答元素的引用传回客户端
+_ANSWER_COUNT_JS = "return document.querySelectorAll('.List-item').length;"
+
+class _AnswerCountAbove:
+    """等待条件：页面回答数量超过给定值"""
+    
+    def __init__(self, count: int):
+        self.count = count
+    
+    def __call__(self, driver) -> bool:
+        return driver.execute_script(_ANSWER_COUNT_JS) > self.count
+
+# 回答列表底部表示已无更多回答的提示文本
+_NO_MORE_TEXTS = ('没有更多',)
+
+# 判断是否还有更多回答：出现"写回答"按钮或列表底部出现无更多提示表示已到底部（finished），
+# 存在"加载更多"按钮或尚未滚动到接近底部表示还有更多（more），否则为bottom
+_MORE_ANSWERS_STATE_JS = """
+var answerButtons = document.querySelectorAll('button[class*="QuestionAnswers-answerButton"]');
+for (var i = 0; i < answerButtons.length; i++) {
+    var nodes = answerButtons[i].childNodes;
+    for (var j = 0; j < nodes.length; j++) {
+        if (nodes[j].nodeType === 3 && nodes[j].nodeValue.indexOf('写回答') !== -1) {
+            return 'finished';
+        }
+    }
+}
+var footers = document.querySelectorAll('.List-header, .Card.MoreAnswers, .QuestionAnswers-answers > .Card:last-child');
+var keywords = arguments[0];
+for (var i = 0; i < footers.length; i++) {
+    var text = footers[i].innerText || '';
+    for (var k = 0; k < keywords.length; k++) {
+        if (text.indexOf(keywords[k]) !== -1) {
+            return 'finished';
+        }
+    }
+}
+if (document.querySelector('.Button--primary, .QuestionAnswers-more button')) {
+    return 'more';
+}
+if (window.pageYOffset + window.innerHeight < document.body.scrollHeight - 1000) {
+    return 'more';
+}
+return 'bottom';
+"""
+
+# 渲染时会换行的元素，用于近似Selenium element.text的换行效果
+_BLOCK_TAGS = frozenset([
+    'p', 'div', 'br', 'li', 'ul', 'ol', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'blockquote', 'pre', 'figure', 'figcaption', 'section', 'table', 'tr', 'hr'
+])
+
+def _collect_text(node, parts: List[str]):
+    tag = node.tag if isinstance(node.tag, str) else None  # 注释等节点只保留tail
+    if tag in ('script', 'style', 'noscript'):
+        return
+    if tag in _BLOCK_TAGS:
+        parts.append('\n')
+    if tag and node.text:
+        parts.append(node.text)
+    for child in node:
+        _collect_text(child, parts)
+        if child.tail:
+            parts.append(child.tail)
+    if tag in _BLOCK_TAGS:
+        parts.append('\n')
+
+def _node_text(node) -> str:
+    """获取节点的可见文本，块级元素处换行，行首尾空白去除"""
+    parts = []
+    _collect_text(node, parts)
+    lines = (line.strip() for line in ''.join(parts).splitlines())
+    return '\n'.join(line for line in lines if line)
+
+def _first_text(element, xpaths) -> Optional[str]:
+    """按顺序尝试XPath，返回第一个匹配节点的非空文本，对应原先逐个选择器find_element的逻辑"""
+    for xpath in xpaths:
+        nodes = xpath(element)
+        if nodes:
+            text = _node_text(nodes[0])
+            if text:
+                return text
+    return None
+
+class RateLimiter:
+    """令牌桶限速器，线程安全
+    
+    预算充足时立即放行，超出速率时只等待到下一个令牌可用，
+    取代每次请求后固定的随机等待。传入shared_state时多个进程共用同一令牌桶
+    """
+    
+    def __init__(self, rate: float, burst: int = 1, shared_state=None):
+        self.rate = rate  # 每秒补充的令牌数
+        self.capacity = burst
+        if shared_state is None:
+            self._state = [float(burst), time.monotonic()]  # [剩余令牌, 上次补充时间]
+            self._lock = threading.Lock()
+        else:
+            self._state = shared_state
+            self._lock = shared_state.get_lock()
+    
+    @staticmethod
+    def create_shared_state(context, burst: int = 1):
+        """创建可在进程间共享的令牌桶状态，context为multiprocessing上下文"""
+        return context.Array('d', [float(burst), time.monotonic()])
+    
+    def acquire(self):
+        """获取一个令牌，令牌不足时阻塞等待"""
+        with self._lock:
+            now = time.monotonic()
+            tokens = min(self.capacity, self._state[0] + (now - self._state[1]) * self.rate)
+            # 先预留令牌，令牌为负时按欠额计算等待时间，在锁外等待
+            tokens -= 1
+            self._state[0] = tokens
+            self._state[1] = now
+            wait_time = -tokens / self.rate if tokens < 0 else 0
+        
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+class AnswerWriter:
+    """后台回答写入线程
+    
+    爬虫线程只负责把待保存的回答放入队列，写入在独立数据库连接上进行，
+    滚动加载页面时不再等待数据库提交
+    """
+    
+    def __init__(self, db_manager: DatabaseManager, max_pending: int = 8):
+        self.db_manager = db_manager
+        self.saved_count = 0  # 已成功写入的回答总数
+        # 队列有上限，写入跟不上时爬虫线程阻塞，避免待写入数据无限堆积
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name='AnswerWriter', daemon=True)
+        self._thread.start()
+    
+    def submit(self, question_url: str, answers: List[Dict],
+               crawl_status: Optional[str] = None, crawled_count: int = 0):
+        """提交一批回答，调用方提交后不应再修改answers列表"""
+        self._queue.put((question_url, answers, crawl_status, crawled_count))
+    
+    def flush(self):
+        """等待已提交的回答全部写入"""
+        self._queue.join()
+    
+    def close(self):
+        """写完剩余数据后结束写入线程并断开连接"""
+        self._queue.put(None)
+        self._thread.join()
+        self.db_manager.disconnect()
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                question_url, answers, crawl_status, crawled_count = item
+                self.saved_count += self.db_manager.save_answers_batch(
+                    question_url, answers,
+                    crawl_status=crawl_status, crawled_count=crawled_count
+                )
+            except Exception as e:
+                logging.error(f"后台写入回答失败: {e}")
+            finally:
+                self._queue.task_done()
 
 class ZhihuCrawler:
     """知乎爬虫类"""
     
-    def __init__(self, db_manager: DatabaseManager, headless: bool = False):
+    # ChromeDriverManager解析出的驱动路径，同一进程内重启浏览器时直接复用，并缓存到磁盘供下次启动使用
+    _chromedriver_path = None
+    
+    def __init__(self, db_manager: DatabaseManager, headless: bool = False, page_limiter_state=None):
         self.db_manager = db_manager
         self.driver = None
         self.wait = None
+        self.load_wait = None
         self.headless = headless
         self.config = get_crawler_config()
         self.answers_per_cleanup = self.config['answers_per_cleanup']
         self.scroll_delay = self.config['scroll_delay']
+        self.max_scroll_retries = self.config['max_scroll_retries']
+        self.max_retries = self.config['max_retries']
+        self.timeout = self.config['timeout']
+        self.driver_restart_pages = self.config['driver_restart_pages']
+        self.cookie_file = self.config['cookie_file']
+        self.chromedriver_cache_file = self.config['chromedriver_cache_file']
+        self.chromedriver_cache_ttl = self.config['chromedriver_cache_ttl']
+        self.html_cache_dir = self.config['html_cache_dir']
+        self._snapshot_file = None  # 本次采集写入的回答HTML临时快照文件
+        self._snapshot_path = None  # 本次采集对应的快照文件路径
+        self._snapshot_ids = set()  # 本次采集已写入快照的回答ID
+        self._pages_since_restart = 0  # 当前浏览器实例已打开的问题页面数
+        # 并行采集时各工作进程传入同一份令牌桶状态，页面打开总速率不随进程数增加
+        self.page_limiter = RateLimiter(
+            self.config['page_load_rate'], self.config['page_load_burst'], shared_state=page_limiter_state
+        )
+        # 滚动按scroll_delay的平均间隔限速，提取回答耗时已计入间隔，不再额外随机等待
+        self.scroll_limiter = RateLimiter(2 / sum(self.scroll_delay))
+        zhihu_config = get_zhihu_config()
+        self.base_url = zhihu_config['base_url'].rstrip('/')
+        self.login_url = zhihu_config['login_url']
         self.current_answer_count = 0
+        self.last_crawled_total = None  # 最近一次采集结束时该问题已入库的回答总数
+        self.answer_writer = None  # 后台回答写入线程，首次采集时创建
+        self._session_dead = False  # 浏览器会话失效标记，仅在捕获到会话类异常时置位
+        self._session_cookies = []  # 最近一次导出或注入的登录Cookie，会话失效后重启浏览器时使用
         
+    def resolve_chromedriver_path(self, refresh: bool = False) -> str:
+        """获取ChromeDriver路径
+        
+        优先使用进程内和磁盘上缓存的路径，缓存过期、驱动文件不存在或refresh为True时才调用ChromeDriverManager重新解析
+        """
+        if not refresh and ZhihuCrawler._chromedriver_path:
+            return ZhihuCrawler._chromedriver_path
+        
+        if not refresh and self.chromedriver_cache_file:
+            try:
+                with open(self.chromedriver_cache_file, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                if (time.time() - cached['timestamp'] < self.chromedriver_cache_ttl
+                        and os.path.exists(cached['path'])):
+                    ZhihuCrawler._chromedriver_path = cached['path']
+                    return cached['path']
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logging.debug("读取ChromeDriver路径缓存失败: %s", e)
+        
+        path = ChromeDriverManager().install()
+        ZhihuCrawler._chromedriver_path = path
+        if self.chromedriver_cache_file:
+            try:
+                tmp_file = f"{self.chromedriver_cache_file}.tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump({'path': path, 'timestamp': time.time()}, f)
+                os.replace(tmp_file, self.chromedriver_cache_file)
+            except Exception as e:
+                logging.debug("保存ChromeDriver路径缓存失败: %s", e)
+        return path
+    
     def setup_driver(self):
         """初始化Chrome浏览器驱动"""
         try:
@@ -39,17 +447,34 @@ class ZhihuCrawler:
             # 反反爬设置
             chrome_options.add_argument('--no-sandbox')
             chrome_options.add_argument('--disable-dev-shm-usage')
+            chrome_options.add_argument('--disk-cache-size=0')  # 不写磁盘缓存，重启浏览器时无需清理
             chrome_options.add_argument('--disable-blink-features=AutomationControlled')
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
             
+            # 不加载图片、不弹通知，采集只需要文本；样式表保留，滚动加载和按钮可见性判断依赖布局
+            chrome_options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2,
+                'profile.default_content_setting_values.notifications': 2,
+                'profile.managed_default_content_settings.media_stream': 2,
+            })
+            chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+            
+            # DOMContentLoaded后即返回，不等待所有子资源加载完毕；后续步骤都以显式等待判断页面内容
+            chrome_options.page_load_strategy = 'eager'
+            
             # 设置用户代理
             chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
             
             # 尝试自动下载ChromeDriver，失败则使用系统PATH
             try:
-                service = Service(ChromeDriverManager().install())
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
+                try:
+                    service = Service(self.resolve_chromedriver_path())
+                    self.driver = webdriver.Chrome(service=service, options=chrome_options)
+                except WebDriverException:
+                    # 缓存的驱动可能与升级后的Chrome版本不匹配，重新解析一次
+                    service = Service(self.resolve_chromedriver_path(refresh=True))
+                    self.driver = webdriver.Chrome(service=service, options=chrome_options)
             except Exception as driver_error:
                 logging.warning(f"自动下载ChromeDriver失败: {driver_error}")
                 logging.info("尝试使用系统PATH中的chromedriver")
@@ -59,7 +484,19 @@ class ZhihuCrawler:
             # 执行反检测脚本
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             
-            self.wait = WebDriverWait(self.driver, 10)
+            # 在网络层拦截媒体、字体和统计上报请求，比内容设置覆盖得更全
+            try:
+                self.driver.execute_cdp_cmd('Network.enable', {})
+                self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': _BLOCKED_URL_PATTERNS})
+            except Exception as e:
+                logging.debug("设置资源拦截失败: %s", e)
+            
+            # 元素等待，轮询间隔缩短，按钮一出现即可点击
+            self.wait = WebDriverWait(self.driver, self.timeout, poll_frequency=0.25)
+            # 短时轮询等待，滚动后等待新回答加载和登录状态探测复用
+            self.load_wait = WebDriverWait(self.driver, 5, poll_frequency=0.2)
+            self._session_dead = False
+            self._pages_since_restart = 0
             logging.info("Chrome浏览器驱动初始化成功")
             
         except Exception as e:
@@ -68,6 +505,11 @@ class ZhihuCrawler:
     
     def wait_for_login(self):
         """等待用户手动登录"""
+        # 有上次保存的登录Cookie且仍然有效时，跳过手动登录
+        if self.load_saved_cookies() and self.check_login_status():
+            print("已使用保存的登录Cookie，跳过手动登录")
+            return True
+        
         print("\n=== 请在浏览器中登录知乎账号 ===")
         print("1. 浏览器将自动打开知乎登录页面")
         print("2. 请手动完成登录操作")
@@ -75,7 +517,7 @@ class ZhihuCrawler:
         print("4. 如需退出，输入 'quit'")
         
         # 打开知乎登录页面
-        self.driver.get('https://www.zhihu.com/signin')
+        self.driver.get(self.login_url)
         
         while True:
             user_input = input("\n请输入 'done' 继续或 'quit' 退出: ").strip().lower()
@@ -83,6 +525,7 @@ class ZhihuCrawler:
                 # 检查是否已登录
                 if self.check_login_status():
                     print("登录验证成功！")
+                    self.save_cookies()
                     break
                 else:
                     print("未检测到登录状态，请确保已完成登录")
@@ -94,17 +537,149 @@ class ZhihuCrawler:
         
         return True
     
+    def get_answer_writer(self) -> AnswerWriter:
+        """获取后台回答写入线程，使用独立的数据库连接"""
+        if self.answer_writer is None:
+            writer_db = self.db_manager.clone()
+            if not writer_db.connect():
+                raise RuntimeError("后台写入数据库连接失败")
+            self.answer_writer = AnswerWriter(writer_db)
+        return self.answer_writer
+    
+    def is_session_valid(self) -> bool:
+        """浏览器会话是否可用，不额外请求浏览器，只读取异常处理时记录的标记"""
+        return not self._session_dead
+    
+    def _record_driver_error(self, error: Exception):
+        """根据异常判断浏览器会话是否已失效"""
+        if self._session_dead:
+            return
+        
+        if isinstance(error, (InvalidSessionIdException, NoSuchWindowException)):
+            self._session_dead = True
+        elif isinstance(error, WebDriverException):
+            message = str(error).lower()
+            if 'chrome not reachable' in message or 'disconnected' in message or 'session deleted' in message:
+                self._session_dead = True
+        
+        if self._session_dead:
+            logging.error(f"浏览器会话已失效: {error}")
+    
+    def get_cookies(self) -> List[Dict]:
+        """导出当前浏览器的登录Cookie"""
+        self._session_cookies = self.driver.get_cookies()
+        return self._session_cookies
+    
+    def load_cookies(self, cookies: List[Dict]):
+        """将已登录会话的Cookie注入当前浏览器"""
+        # 只注入与知乎域名匹配的Cookie，不匹配的Cookie注入时必然失败
+        host = urlparse(self.base_url).hostname
+        cookies = [
+            cookie for cookie in cookies
+            if not cookie.get('domain')
+            or host == cookie['domain'].lstrip('.')
+            or host.endswith('.' + cookie['domain'].lstrip('.'))
+        ]
+        self._session_cookies = cookies
+        try:
+            # 通过CDP直接写入Cookie，无需先打开同域页面
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            for cookie in cookies:
+                params = {k: v for k, v in cookie.items() if k != 'expiry'}
+                if 'expiry' in cookie:
+                    params['expires'] = cookie['expiry']
+                self.driver.execute_cdp_cmd('Network.setCookie', params)
+        except Exception as e:
+            logging.debug("CDP注入Cookie失败，改用add_cookie: %s", e)
+            # add_cookie要求先打开同域页面
+            self.driver.get(self.base_url)
+            for cookie in cookies:
+                try:
+                    self.driver.add_cookie(cookie)
+                except Exception as e:
+                    logging.debug("注入Cookie失败 %s: %s", cookie.get('name'), e)
+        logging.info(f"已注入 {len(cookies)} 个Cookie")
+    
+    def save_cookies(self):
+        """将当前登录Cookie保存为JSON文件"""
+        if not self.cookie_file:
+            return
+        try:
+            # 先写临时文件再替换，中途退出也不会留下写了一半的Cookie文件
+            tmp_file = f"{self.cookie_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.get_cookies(), f, ensure_ascii=False)
+            os.replace(tmp_file, self.cookie_file)
+            logging.info(f"登录Cookie已保存到 {self.cookie_file}")
+        except Exception as e:
+            logging.warning(f"保存登录Cookie失败: {e}")
+    
+    def load_saved_cookies(self) -> bool:
+        """读取保存的登录Cookie并注入浏览器，没有可用的Cookie文件时返回False"""
+        if not self.cookie_file:
+            return False
+        try:
+            with open(self.cookie_file, 'r', encoding='utf-8') as f:
+                cookies = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logging.warning(f"读取登录Cookie失败: {e}")
+            return False
+        self.load_cookies(cookies)
+        return True
+    
+    def restart_driver(self):
+        """重启浏览器并恢复登录Cookie，用于释放长时间运行积累的内存和恢复失效的会话"""
+        try:
+            cookies = self.get_cookies()
+        except Exception as e:
+            # 会话已失效时取不到Cookie，使用最近一次导出或注入的Cookie
+            logging.debug("导出登录Cookie失败，使用此前的Cookie: %s", e)
+            cookies = self._session_cookies
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logging.debug("关闭旧浏览器失败: %s", e)
+        self.driver = None
+        # 先清零计数，重启失败时不会在之后每个问题上反复触发定期重启
+        self._pages_since_restart = 0
+        try:
+            self.setup_driver()
+        except Exception:
+            self._session_dead = True
+            raise
+        if cookies:
+            self.load_cookies(cookies)
+        else:
+            self.load_saved_cookies()
+        logging.info("浏览器已重启")
+    
+    def recover_session(self) -> bool:
+        """浏览器会话失效时重启浏览器，返回会话是否可用"""
+        if not self._session_dead:
+            return True
+        logging.warning("浏览器会话已失效，尝试重启浏览器")
+        try:
+            self.restart_driver()
+        except Exception as e:
+            logging.error(f"重启浏览器失败: {e}")
+            return False
+        return True
+    
     def check_login_status(self) -> bool:
         """检查登录状态"""
         try:
             # 检查页面是否包含用户信息
-            self.driver.get('https://www.zhihu.com')
-            time.sleep(2)
+            self.driver.get(self.base_url)
             
-            # 查找用户头像或用户菜单
-            user_elements = self.driver.find_elements(By.CSS_SELECTOR, '.Avatar, .Menu-item, [data-za-detail-view-element_name="Profile"]')
-            return len(user_elements) > 0
+            # 在页面内同时判断用户头像和登录按钮，任一出现即返回，不再固定等待
+            state = self.load_wait.until(_LoginStateKnown())
+            return state == 'in'
             
+        except TimeoutException:
+            logging.warning("等待登录状态超时，按未登录处理")
+            return False
         except Exception as e:
             logging.error(f"检查登录状态失败: {e}")
             return False
@@ -114,142 +689,152 @@ class ZhihuCrawler:
         try:
             logging.info(f"开始爬取问题: {question_url}，目标回答数: {target_count}")
             
-            # 访问问题页面
+            # 会话失效时重启浏览器；浏览器长时间运行后内存和页面加载耗时持续增长，也定期重启
+            if self._session_dead:
+                self.restart_driver()
+            elif self.driver_restart_pages and self._pages_since_restart >= self.driver_restart_pages:
+                logging.info("已打开 %d 个问题页面，重启浏览器", self._pages_since_restart)
+                self.restart_driver()
+            
+            # 访问问题页面，按令牌桶速率限制页面打开频率
+            self.page_limiter.acquire()
             self.driver.get(question_url)
-            time.sleep(random.uniform(0.67, 1.33))
+            self._pages_since_restart += 1
+            self.open_html_snapshot(question_url)
             
             # 点击"查看全部回答"按钮
             self.click_view_all_answers()
             
             crawled_answer_ids = set()  # 只保存ID用于去重判断，使用集合提升查找性能
+            # 此前已入库的回答ID，一次查询载入，后续跳过重复写入
+            stored_answer_ids = self.db_manager.get_crawled_answer_ids(question_url)
+            known_answer_ids = set(stored_answer_ids)  # 已采集或已入库的回答，提取时只取ID
             pending_answers = []     # 待批量保存的回答数据
             self.current_answer_count = 0
+            self.last_crawled_total = None
+            answer_writer = self.get_answer_writer()
+            saved_before = answer_writer.saved_count
             no_new_data_count = 0  # 连续无新数据的次数
-            batch_size = 50          # 批量保存大小
+            scroll_retry_count = 0  # 连续回滚重试仍无新数据的轮数
+            batch_size = self.answers_per_cleanup  # 批量保存大小，每次保存后清理DOM
+            first_round = True  # 首轮先提取页面初始已渲染的回答，回答较少的问题无需滚动即可完成
             
             while len(crawled_answer_ids) < target_count:
                 # 记录滚动前的回答数量
                 previous_count = len(crawled_answer_ids)
                 
-                # 滚动加载更多回答
-                self.scroll_to_load_more()
+                # 滚动加载更多回答，按令牌桶控制滚动频率
+                if not first_round:
+                    self.scroll_limiter.acquire()
+                    self.scroll_to_load_more()
                 
-                # 获取当前页面的回答
-                new_answers = self.extract_answers_from_page()
-                
-                # 过滤重复回答并记录新增数据
+                # 逐个获取当前页面的回答，过滤重复回答并记录新增数据
                 new_answer_ids = []
-                for answer in new_answers:
-                    if answer['answer_id'] not in crawled_answer_ids:
-                        crawled_answer_ids.add(answer['answer_id'])
-                        new_answer_ids.append(answer['answer_id'])
-                        pending_answers.append(answer)
+                for answer in self.extract_answers_from_page(known_answer_ids):
+                    answer_id = answer['answer_id']
+                    if answer_id not in crawled_answer_ids:
+                        crawled_answer_ids.add(answer_id)
+                        known_answer_ids.add(answer_id)
+                        new_answer_ids.append(answer_id)
+                        if answer_id not in stored_answer_ids:
+                            pending_answers.append(answer)
                 
                 # 只打印新增的回答ID
                 if new_answer_ids:
-                    logging.info(f"新增回答ID: {new_answer_ids}")
+                    logging.debug("新增回答ID: %s", new_answer_ids)
+                collected_count = len(crawled_answer_ids)  # 本轮提取后的采集数量，下面多处复用
                 
                 # 批量保存到数据库
-                if len(pending_answers) >= batch_size or len(crawled_answer_ids) >= target_count:
-                    saved_count = self.db_manager.save_answers_batch(question_url, pending_answers)
-                    self.current_answer_count += saved_count
-                    pending_answers.clear()  # 清空待保存列表
+                if len(pending_answers) >= batch_size or collected_count >= target_count:
+                    # 交给后台线程写入，列表随之移交，这里换用新列表
+                    answer_writer.submit(question_url, pending_answers)
+                    logging.info("已提交 %d 个回答到后台写入", len(pending_answers))
+                    pending_answers = []
                     
                     # 执行优化的DOM清理
                     self.cleanup_dom_optimized()
-                    logging.info(f"已批量保存 {saved_count} 个回答，当前总计 {self.current_answer_count} 个")
                 
                 # 检查是否有新数据
-                if len(crawled_answer_ids) == previous_count:
+                if collected_count == previous_count:
                     no_new_data_count += 1
-                    logging.info(f"本次滚动无新数据，连续无新数据次数: {no_new_data_count}")
+                    logging.info("本次滚动无新数据，连续无新数据次数: %d", no_new_data_count)
                     
                     # 如果连续3次无新数据，触发重试机制
                     if no_new_data_count >= 3:
+                        # 多轮回滚重试后仍无新数据，认为已收敛，停止滚动
+                        if scroll_retry_count >= self.max_scroll_retries:
+                            logging.info(f"连续 {scroll_retry_count} 轮重试仍无新数据，停止滚动")
+                            break
                         logging.info("连续3次无新数据，触发滚动重试机制")
                         self.scroll_retry_mechanism()
+                        scroll_retry_count += 1
                         no_new_data_count = 0  # 重置计数器
                 else:
                     no_new_data_count = 0  # 有新数据时重置计数器
+                    scroll_retry_count = 0
                 
-                logging.info(f"当前已采集 {len(crawled_answer_ids)} 个回答")
+                logging.info("当前已采集 %d 个回答", collected_count)
                 
-                # 检查是否还有更多回答可加载
-                if not self.has_more_answers():
+                # 检查是否还有更多回答可加载，首轮尚未滚动，不做判断
+                if not first_round and not self.has_more_answers():
                     logging.info("已到达页面底部，无更多回答")
                     break
-                
-                # 滚动间隔延时
-                time.sleep(random.uniform(*self.scroll_delay))
+                first_round = False
             
-            # 保存剩余的回答数据
-            if pending_answers:
-                saved_count = self.db_manager.save_answers_batch(question_url, pending_answers)
-                self.current_answer_count += saved_count
-                logging.info(f"保存剩余 {saved_count} 个回答")
-            
-            # 更新数据库中的爬取状态
-            status = "completed" if len(crawled_answer_ids) >= target_count else "partial"
-            self.db_manager.update_crawl_status(question_url, status, len(crawled_answer_ids))
+            # 保存剩余的回答数据，并在同一事务中更新爬取状态
+            collected_count = len(crawled_answer_ids)
+            status = "completed" if collected_count >= target_count else "partial"
+            answer_writer.submit(
+                question_url, pending_answers,
+                crawl_status=status, crawled_count=collected_count
+            )
+            # 等待本问题的回答全部落库，调用方随后会读取数据库中的采集数量
+            answer_writer.flush()
+            self.current_answer_count = answer_writer.saved_count - saved_before
+            self.last_crawled_total = answer_writer.db_manager.crawled_totals.pop(question_url, None)
+            logging.info(f"本问题共保存 {self.current_answer_count} 个新回答")
             
-            logging.info(f"问题爬取完成，共采集 {len(crawled_answer_ids)} 个回答")
-            return len(crawled_answer_ids)
+            logging.info(f"问题爬取完成，共采集 {collected_count} 个回答")
+            return collected_count
             
         except Exception as e:
+            self._record_driver_error(e)
+            # 会话仍有效时的超时、网络类错误通常是暂时的，交给调用方退避重试
+            if isinstance(e, WebDriverException) and not self._session_dead:
+                raise
             logging.error(f"爬取问题回答失败: {e}")
             return 0
+        finally:
+            self.close_html_snapshot()
+    
+    def crawl_question_with_retry(self, question_url: str, target_count: int) -> int:
+        """爬取问题回答，遇到暂时性错误时按指数退避加随机抖动重试"""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return self.crawl_question_answers(question_url, target_count)
+            except WebDriverException as e:
+                if attempt >= self.max_retries or not self.is_session_valid():
+                    logging.error(f"爬取问题回答失败，已重试 {attempt} 次: {e}")
+                    return 0
+                delay = min(2 ** attempt, 30) * random.uniform(0.5, 1.0)
+                logging.warning(f"爬取问题回答遇到暂时性错误，{delay:.1f} 秒后第 {attempt + 1} 次尝试: {e}")
+                # 等待上次尝试提交的回答落库，重试时可据此跳过已保存的回答
+                if self.answer_writer:
+                    self.answer_writer.flush()
+                time.sleep(delay)
+        return 0
     
     def click_view_all_answers(self):
         """点击查看全部回答按钮"""
         try:
-            # 查找"查看全部回答"按钮的多种可能选择器
-            view_all_selectors = [
-                '.Card.ViewAll a[data-za-detail-view-element_name="ViewAll"]',
-                '.ViewAll-QuestionMainAction',
-                '.Card.ViewAll a',
-                'a[data-za-detail-view-element_name="ViewAll"]',
-                'button[data-za-detail-view-element_name="QuestionAnswers-more"]',
-                '.QuestionAnswers-more button'
-            ]
-            
-            for selector in view_all_selectors:
-                try:
-                    # 等待按钮出现并可点击
-                    view_all_btn = self.wait.until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                    )
-                    
-                    # 滚动到按钮位置
-                    self.driver.execute_script("arguments[0].scrollIntoView(true);", view_all_btn)
-                    
-                    # 点击按钮
-                    self.driver.execute_script("arguments[0].click();", view_all_btn)
-                    logging.info(f"成功点击查看全部回答按钮: {selector}")
-                    return True
-                    
-                except TimeoutException:
-                    continue
-                except Exception as e:
-                    logging.warning(f"点击按钮失败 {selector}: {e}")
-                    continue
-            
-            # 如果没有找到按钮，尝试通过文本查找（仅查找button元素）
-            try:
-                # 只查找button标签，避免点击a标签链接
-                elements = self.driver.find_elements(By.TAG_NAME, "button")
-                for element in elements:
-                    element_text = element.text.strip()
-                    if "查看全部" in element_text or "个回答" in element_text:
-                        self.driver.execute_script("arguments[0].scrollIntoView(true);", element)
-                        self.driver.execute_script("arguments[0].click();", element)
-                        logging.info(f"通过文本找到并点击按钮元素: {element_text}")
-                        return True
-            except Exception as e:
-                logging.warning(f"通过文本查找按钮失败: {e}")
+            # 所有选择器和文本匹配在一次脚本调用中完成，轮询直到按钮出现或超时
+            label = self.wait.until(_ViewAllClicked())
+            logging.info(f"成功点击查看全部回答按钮: {label}")
+            return True
             
+        except TimeoutException:
             logging.info("未找到查看全部回答按钮，可能已经显示所有回答")
             return False
-            
         except Exception as e:
             logging.warning(f"点击查看全部回答按钮失败: {e}")
             return False
@@ -257,205 +842,224 @@ class ZhihuCrawler:
     def scroll_to_load_more(self):
         """直接跳转到页面底部加载更多回答"""
         try:
-            # 直接跳转到页面底部
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            
-            logging.info("直接跳转到页面底部")
-            
-            # 等待页面加载
-            time.sleep(0.5)
+            # 记录回答数量、跳转到页面底部、按优先级查找并点击"加载更多"按钮，在一次脚本调用中完成
+            previous_count, clicked = self.driver.execute_script(_SCROLL_AND_LOAD_MORE_JS, _LOAD_MORE_SELECTORS)
+            logging.debug("直接跳转到页面底部")
+            if clicked:
+                logging.info("成功点击加载更多按钮: %s", clicked)
             
-            # 尝试查找并点击"加载更多"按钮（如果存在）
-            load_more_selectors = [
-                '.QuestionAnswers-more button',  # 问题回答区域的加载更多按钮
-                'button[class*="QuestionAnswers"][class*="more"]',  # 包含QuestionAnswers和more的按钮
-                '.List-more button',  # 列表区域的加载更多按钮
-                '.QuestionAnswers-actions button',  # 问题回答操作区域的按钮
-                'button[class*="LoadMore"]'  # 包含LoadMore的按钮
-            ]
-            
-            for selector in load_more_selectors:
-                try:
-                    load_more_btn = WebDriverWait(self.driver, 2).until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
-                    )
-                    # 确保按钮在视口内且不是搜索按钮
-                    if ('SearchBar' not in load_more_btn.get_attribute('class') and 
-                        'Search' not in (load_more_btn.get_attribute('aria-label') or '')):
-                        self.driver.execute_script("arguments[0].click();", load_more_btn)
-                        logging.info(f"成功点击加载更多按钮: {selector}")
-                        break
-                except TimeoutException:
-                    continue
+            # 等待新回答出现，新内容一到即返回，超时则交由上层判断是否无新数据
+            try:
+                self.load_wait.until(_AnswerCountAbove(previous_count))
+            except TimeoutException:
+                logging.debug("等待新回答加载超时")
                 
         except Exception as e:
-            logging.warning(f"滚动加载失败: {e}")
+            self._record_driver_error(e)
+            logging.warning("滚动加载失败: %s", e)
     
-    def extract_answers_from_page(self) -> List[Dict]:
-        """从当前页面提取回答数据"""
-        answers = []
+    def extract_answers_from_page(self, skip_ids: Optional[Set[str]] = None) -> Iterator[Dict]:
+        """从当前页面逐个提取回答数据，skip_ids中的回答只返回ID
+        
+        一次取回所有回答元素的HTML，用lxml在本地解析，
+        不再为每个回答的每个字段发起WebDriver请求；以生成器形式返回
+        """
+        extracted_count = 0
         try:
-            # 查找所有回答元素
-            answer_elements = self.driver.find_elements(By.CSS_SELECTOR, '.List-item')
-            logging.info(f"找到 {len(answer_elements)} 个List-item元素")
+            items_html = self.driver.execute_script(_ANSWER_ITEMS_HTML_JS)
+            answer_elements = list(lxml_html.fragment_fromstring(items_html, create_parent='div')) if items_html else []
+            logging.debug("找到 %d 个List-item元素", len(answer_elements))
             
             for i, element in enumerate(answer_elements):
                 try:
-                    answer_data = self.extract_single_answer(element, i)
-                    if answer_data:
-                        answers.append(answer_data)
-                    else:
-                        logging.warning(f"第 {i+1} 个元素未能提取到有效数据")
+                    answer_data = self.extract_single_answer(element, skip_ids)
                 except Exception as e:
-                    logging.warning(f"提取第 {i+1} 个回答失败: {e}")
+                    logging.warning("提取第 %d 个回答失败: %s", i + 1, e)
                     continue
+                
+                if answer_data:
+                    extracted_count += 1
+                    # 每个回答在本次采集中只写入快照一次；已入库、只返回ID的回答同样写入，续爬后快照仍然完整
+                    if self._snapshot_file is not None and answer_data['answer_id'] not in self._snapshot_ids:
+                        self._snapshot_ids.add(answer_data['answer_id'])
+                        self._snapshot_file.write(json.dumps({
+                            'answer_id': answer_data['answer_id'],
+                            'html': etree.tostring(element, encoding='unicode', with_tail=False),
+                        }, ensure_ascii=False) + '\n')
+                    yield answer_data
+                else:
+                    logging.warning("第 %d 个元素未能提取到有效数据", i + 1)
                     
         except Exception as e:
+            self._record_driver_error(e)
             logging.error(f"提取页面回答失败: {e}")
             
-        logging.info(f"本次提取到 {len(answers)} 个有效回答")
-        return answers
+        logging.info("本次提取到 %d 个有效回答", extracted_count)
+    
+    def html_snapshot_path(self, question_url: str) -> str:
+        """问题对应的回答HTML快照文件路径"""
+        name = extract_question_id(question_url) or hashlib.blake2b(question_url.encode('utf-8'), digest_size=8).hexdigest()
+        return os.path.join(self.html_cache_dir, f"{name}.html.gz")
+    
+    def open_html_snapshot(self, question_url: str):
+        """开始保存当前问题的回答HTML快照，未配置快照目录时不保存
+        
+        本次采集先写入临时文件，正常关闭后再与已有快照按回答ID合并，
+        采集中途退出只会留下不完整的临时文件，已有快照不受影响
+        """
+        self.close_html_snapshot()
+        if not self.html_cache_dir:
+            return
+        try:
+            os.makedirs(self.html_cache_dir, exist_ok=True)
+            self._snapshot_path = self.html_snapshot_path(question_url)
+            self._snapshot_file = gzip.open(f"{self._snapshot_path}.tmp", 'wt', encoding='utf-8')
+            self._snapshot_ids = set()
+        except OSError as e:
+            logging.warning("创建回答HTML快照失败: %s", e)
+    
+    def close_html_snapshot(self):
+        """关闭本次采集的临时快照，并合并到问题的回答HTML快照中"""
+        if self._snapshot_file is None:
+            return
+        try:
+            self._snapshot_file.close()
+            self._merge_html_snapshot(self._snapshot_path)
+        except (OSError, EOFError, ValueError) as e:
+            logging.warning("保存回答HTML快照失败: %s", e)
+        finally:
+            self._snapshot_file = None
+    
+    @staticmethod
+    def _read_html_snapshot(path: str) -> Dict[str, Dict]:
+        """读取快照文件，返回{回答ID: 快照记录}，同一回答以后写入的为准"""
+        entries = {}
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                entries[entry['answer_id']] = entry
+        return entries
+    
+    def _merge_html_snapshot(self, path: str):
+        """将本次采集的临时快照按回答ID合并到已有快照，写完后原子替换"""
+        tmp_file = f"{path}.tmp"
+        try:
+            entries = self._read_html_snapshot(path)
+        except FileNotFoundError:
+            entries = {}
+        entries.update(self._read_html_snapshot(tmp_file))
+        with gzip.open(tmp_file, 'wt', encoding='utf-8') as f:
+            for entry in entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp_file, path)
     
-    def extract_single_answer(self, element, index: int = 0) -> Optional[Dict]:
-        """提取单个回答的数据"""
+    def extract_answers_from_snapshot(self, question_url: str) -> Iterator[Dict]:
+        """从已保存的回答HTML快照中提取回答数据，无需打开浏览器；快照不存在时不返回任何回答
+        
+        快照按回答ID保存各回答元素的HTML，调整提取逻辑后可直接重新解析
+        """
+        try:
+            entries = self._read_html_snapshot(self.html_snapshot_path(question_url))
+        except FileNotFoundError:
+            logging.info("问题没有回答HTML快照: %s", question_url)
+            return
+        except (OSError, EOFError) as e:
+            logging.warning("读取回答HTML快照失败: %s, %s", question_url, e)
+            return
+        
+        for entry in entries.values():
+            try:
+                answer_data = self.extract_single_answer(lxml_html.fragment_fromstring(entry['html']))
+            except Exception as e:
+                logging.warning("解析快照中的回答失败: %s", e)
+                continue
+            if answer_data:
+                yield answer_data
+    
+    def extract_single_answer(self, element, skip_ids: Optional[Set[str]] = None) -> Optional[Dict]:
+        """从lxml解析出的回答元素中提取单个回答的数据"""
         try:
             # 获取回答ID - 尝试多种方式
-            answer_id = None
-            
             # 方式1: 直接从元素获取
-            answer_id = element.get_attribute('data-id') or element.get_attribute('id')
+            answer_id = element.get('data-id') or element.get('id')
             
-            # 方式2: 从子元素的href属性获取（不触发点击）
+            # 方式2: 从子元素的href属性获取
             if not answer_id:
-                try:
-                    # 查找包含answer链接的元素，但只获取属性，不进行任何操作
-                    answer_links = element.find_elements(By.CSS_SELECTOR, 'a[href*="/answer/"]')
-                    for link in answer_links:
-                        href = link.get_attribute('href')
-                        if href and '/answer/' in href:
-                            answer_id = href.split('/answer/')[-1].split('?')[0]
-                            break
-                except:
-                    pass
+                for href in _ANSWER_LINK_XPATH(element):
+                    answer_id = self.extract_id_from_url(href)
+                    if answer_id:
+                        break
             
             # 方式3: 从data-za-detail-view-id获取
             if not answer_id:
-                try:
-                    answer_id = element.get_attribute('data-za-detail-view-id')
-                except:
-                    pass
-            
-            # 方式4: 使用索引作为临时ID
-            if not answer_id:
-                answer_id = f"temp_answer_{index}_{int(time.time())}"
-                logging.warning(f"无法获取回答ID，使用临时ID: {answer_id}")
+                answer_id = element.get('data-za-detail-view-id')
             
-            logging.debug(f"获取到回答ID: {answer_id}")
+            if answer_id:
+                logging.debug("获取到回答ID: %s", answer_id)
+                # 已采集或已入库的回答只需ID参与去重计数，跳过其余字段的提取
+                if skip_ids and answer_id in skip_ids:
+                    return {'answer_id': answer_id}
             
             # 获取作者信息
-            author = "匿名用户"
-            try:
-                author_selectors = ['.AuthorInfo-name', '.UserLink-link', '.AuthorInfo .Popover div']
-                for selector in author_selectors:
-                    try:
-                        author_element = element.find_element(By.CSS_SELECTOR, selector)
-                        if author_element and author_element.text.strip():
-                            author = author_element.text.strip()
-                            break
-                    except:
-                        continue
-            except Exception as e:
-                logging.debug(f"获取作者信息失败: {e}")
+            author = _first_text(element, _AUTHOR_XPATHS) or "匿名用户"
             
-            # 获取回答内容 - 使用正确的选择器
-            content = ""
-            try:
-                # 根据用户提供的信息，回答正文在 .RichContent-inner 中
-                content_element = element.find_element(By.CSS_SELECTOR, '.RichContent-inner')
-                if content_element and content_element.text.strip():
-                    content = content_element.text.strip()
-                    logging.debug(f"成功获取回答内容，长度: {len(content)}")
-                else:
-                    # 备选选择器
-                    backup_selectors = ['.CopyrightRichText-richText', '.RichText', '.AnswerItem-content']
-                    for selector in backup_selectors:
-                        try:
-                            content_element = element.find_element(By.CSS_SELECTOR, selector)
-                            if content_element and content_element.text.strip():
-                                content = content_element.text.strip()
-                                logging.debug(f"使用备选选择器 {selector} 获取内容，长度: {len(content)}")
-                                break
-                        except:
-                            continue
-            except Exception as e:
-                logging.debug(f"获取回答内容失败: {e}")
+            # 获取回答内容，回答正文在 .RichContent-inner 中，取不到时使用备选选择器
+            content = _first_text(element, [_CONTENT_XPATH])
+            if content:
+                logging.debug("成功获取回答内容，长度: %d", len(content))
+            else:
+                content = _first_text(element, _CONTENT_BACKUP_XPATHS) or ""
+                logging.debug("使用备选选择器获取内容，长度: %d", len(content))
             
-            # 获取点赞数 - 使用正确的选择器
+            # 获取点赞数，在 .ContentItem-actions 中查找赞同按钮，按钮的 aria-label 包含赞同数量
             vote_count = 0
-            try:
-                # 根据用户提供的信息，在 .ContentItem-actions 中查找赞同按钮
-                actions_element = element.find_element(By.CSS_SELECTOR, '.ContentItem-actions')
-                if actions_element:
-                    # 查找赞同按钮，按钮的 aria-label 包含赞同数量
-                    vote_button = actions_element.find_element(By.CSS_SELECTOR, 'button.VoteButton[aria-label*="赞同"]')
-                    if vote_button:
-                        aria_label = vote_button.get_attribute('aria-label')
-                        if aria_label:
-                            # 从 aria-label 中提取数字，格式如 "赞同 131 "
-                            import re
-                            match = re.search(r'赞同\s+(\d+)', aria_label)
-                            if match:
-                                vote_count = int(match.group(1))
-                                logging.debug(f"从 aria-label 获取点赞数: {vote_count}")
-                            else:
-                                # 尝试从按钮文本中获取
-                                button_text = vote_button.text.strip()
-                                vote_count = self.parse_vote_count(button_text)
-                                logging.debug(f"从按钮文本获取点赞数: {vote_count}")
-                        else:
-                            # 备选方案：从按钮文本获取
-                            button_text = vote_button.text.strip()
-                            vote_count = self.parse_vote_count(button_text)
-                            logging.debug(f"从按钮文本获取点赞数: {vote_count}")
+            actions = _ACTIONS_XPATH(element)
+            if actions:
+                vote_buttons = _VOTE_BUTTON_XPATH(actions[0])
+                if vote_buttons:
+                    vote_button = vote_buttons[0]
+                    # 从 aria-label 中提取数字，格式如 "赞同 131 "
+                    match = _VOTE_LABEL_RE.search(vote_button.get('aria-label', ''))
+                    if match:
+                        vote_count = int(match.group(1))
+                        logging.debug("从 aria-label 获取点赞数: %s", vote_count)
                     else:
-                        logging.debug("未找到赞同按钮")
+                        # 备选方案：从按钮文本获取
+                        vote_count = self.parse_vote_count(_node_text(vote_button))
+                        logging.debug("从按钮文本获取点赞数: %s", vote_count)
                 else:
-                    # 备选选择器
-                    backup_selectors = ['.VoteButton--up .Button-label', '.VoteButton .Voters', '.Button--plain']
-                    for selector in backup_selectors:
-                        try:
-                            vote_element = element.find_element(By.CSS_SELECTOR, selector)
-                            if vote_element and vote_element.text.strip():
-                                vote_text = vote_element.text.strip()
-                                vote_count = self.parse_vote_count(vote_text)
-                                logging.debug(f"使用备选选择器 {selector} 获取点赞数: {vote_count}")
-                                break
-                        except:
-                            continue
-            except Exception as e:
-                logging.debug(f"获取点赞数失败: {e}")
+                    logging.debug("未找到赞同按钮")
+            else:
+                vote_text = _first_text(element, _VOTE_BACKUP_XPATHS)
+                if vote_text:
+                    vote_count = self.parse_vote_count(vote_text)
+                    logging.debug("使用备选选择器获取点赞数: %s", vote_count)
             
             # 获取创建时间
             created_time = None
-            try:
-                time_selectors = ['.ContentItem-time', '.AnswerItem-time', 'time']
-                for selector in time_selectors:
-                    try:
-                        time_element = element.find_element(By.CSS_SELECTOR, selector)
-                        if time_element:
-                            created_time = time_element.get_attribute('datetime') or time_element.text.strip()
-                            if created_time:
-                                break
-                    except:
-                        continue
-            except Exception as e:
-                logging.debug(f"获取创建时间失败: {e}")
+            for xpath in _TIME_XPATHS:
+                time_nodes = xpath(element)
+                if time_nodes:
+                    created_time = time_nodes[0].get('datetime') or _node_text(time_nodes[0])
+                    if created_time:
+                        break
             
             # 验证数据完整性
             if not content and not author:
-                logging.warning(f"回答 {answer_id} 缺少关键数据，跳过")
+                logging.warning("回答 %s 缺少关键数据，跳过", answer_id)
                 return None
             
+            # 方式4: 由作者和内容生成稳定的临时ID，同一回答在多次滚动和多个进程中得到相同ID
+            if not answer_id:
+                digest = hashlib.blake2b(f"{author}\n{content}".encode('utf-8'), digest_size=8).hexdigest()
+                answer_id = f"temp_answer_{digest}"
+                logging.warning("无法获取回答ID，使用临时ID: %s", answer_id)
+                if skip_ids and answer_id in skip_ids:
+                    return {'answer_id': answer_id}
+            
             return {
                 'answer_id': answer_id,
                 'author': author,
@@ -464,32 +1068,32 @@ class ZhihuCrawler:
                 'created_time': created_time
             }
             
-        except NoSuchElementException:
-            return None
         except Exception as e:
-            logging.warning(f"解析回答数据失败: {e}")
+            logging.warning("解析回答数据失败: %s", e)
             return None
     
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def extract_id_from_url(url: str) -> Optional[str]:
+        """从回答链接中提取回答ID，无法提取时返回None"""
+        match = _ANSWER_ID_RE.search(url)
+        return match.group(1) if match else None
+    
     def parse_vote_count(self, vote_text: str) -> int:
         """解析点赞数文本"""
+        if not vote_text:
+            return 0
+        
+        # 处理"1.2万"这种格式：一次匹配取出数字和量级，再查表换算
+        match = _VOTE_COUNT_RE.search(vote_text)
+        if not match:
+            return 0
+        
         try:
-            if not vote_text or vote_text == "赞同":
-                return 0
-            
-            # 处理"1.2万"这种格式
-            if "万" in vote_text:
-                number = float(re.findall(r'[\d.]+', vote_text)[0])
-                return int(number * 10000)
-            elif "千" in vote_text:
-                number = float(re.findall(r'[\d.]+', vote_text)[0])
-                return int(number * 1000)
-            else:
-                # 提取数字
-                numbers = re.findall(r'\d+', vote_text)
-                return int(numbers[0]) if numbers else 0
-                
-        except Exception:
+            number = float(match.group(1).replace(',', ''))
+        except ValueError:
             return 0
+        return int(number * _VOTE_MULTIPLIERS[match.group(2)])
     
     def cleanup_dom(self):
         """清理DOM，移除已处理的回答元素"""
@@ -588,15 +1192,18 @@ class ZhihuCrawler:
         try:
             logging.info("触发页面回滚机制：连续3次到达底部且无新内容")
             
-            # 第一次向上滚动
-            self.driver.execute_script("window.scrollBy(0, -800);")
-            time.sleep(random.uniform(*self.scroll_delay))
-            logging.info("执行第一次向上滚动")
-            
-            # 第二次向上滚动
-            self.driver.execute_script("window.scrollBy(0, -800);")
-            time.sleep(random.uniform(*self.scroll_delay))
-            logging.info("执行第二次向上滚动")
+            # 每次向上滚动后等待新回答出现，而不是固定休眠；新回答一到即结束回滚
+            previous_count = self.driver.execute_script(_ANSWER_COUNT_JS)
+            retry_wait = WebDriverWait(self.driver, self.scroll_delay[1], poll_frequency=0.25)
+            for attempt in ("第一次", "第二次"):
+                self.driver.execute_script("window.scrollBy(0, -800);")
+                logging.info("执行%s向上滚动", attempt)
+                try:
+                    retry_wait.until(_AnswerCountAbove(previous_count))
+                    logging.info("回滚后加载到新回答")
+                    break
+                except TimeoutException:
+                    pass
             
             logging.info("页面回滚机制完成，恢复向下滚动功能")
             
@@ -606,37 +1213,23 @@ class ZhihuCrawler:
     def has_more_answers(self) -> bool:
         """检查是否还有更多回答可加载"""
         try:
-            # 首先检查是否出现"写回答"按钮，如果出现则表示已到达页面底部，没有更多回答
-            write_answer_buttons = self.driver.find_elements(
-                By.XPATH, 
-                "//button[contains(@class, 'QuestionAnswers-answerButton') and contains(text(), '写回答')]"
-            )
-            if write_answer_buttons:
-                logging.info("检测到'写回答'按钮，回答采集完毕")
+            # "写回答"按钮、无更多提示、"加载更多"按钮和滚动位置在一次脚本调用中探测
+            state = self.driver.execute_script(_MORE_ANSWERS_STATE_JS, _NO_MORE_TEXTS)
+            if state == 'finished':
+                logging.info("检测到'写回答'按钮或无更多回答提示，回答采集完毕")
                 return False
-            
-            # 检查是否有"加载更多"按钮
-            load_more_buttons = self.driver.find_elements(By.CSS_SELECTOR, '.Button--primary, .QuestionAnswers-more button')
-            if load_more_buttons:
-                return True
-            
-            # 检查当前页面高度，但不主动滚动
-            current_scroll_position = self.driver.execute_script("return window.pageYOffset")
-            page_height = self.driver.execute_script("return document.body.scrollHeight")
-            window_height = self.driver.execute_script("return window.innerHeight")
-            
-            # 如果还没有滚动到接近底部，认为还有更多内容
-            if current_scroll_position + window_height < page_height - 1000:
-                return True
-            
-            return False
+            return state == 'more'
             
         except Exception as e:
-            logging.warning(f"检查更多回答失败: {e}")
+            self._record_driver_error(e)
+            logging.warning("检查更多回答失败: %s", e)
             return False
     
     def close(self):
         """关闭浏览器"""
+        if self.answer_writer:
+            self.answer_writer.close()
+            self.answer_writer = None
         if self.driver:
             self.driver.quit()
             logging.info("浏览器已关闭")
\ No newline at end of file